@@ -1,80 +1,232 @@
 # cld_graphviz.py - Professional CLD Generator with Graphviz
 import re
+import sys
 import networkx as nx
-import pydot  # type: ignore
+import graphviz
 from pathlib import Path
 import tempfile
 import os
 import math
-import shutil
+import time
+import functools
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+# One relation per line: "source sign destination", scanned over the whole file
+# at once; [^\S\n] is whitespace within a line. Comments need no stripping:
+# '#' can't appear inside a relation, so a match always stops before a comment.
+_EDGE_RE = re.compile(r"^[^\S\n]*([A-Za-z0-9_]+)[^\S\n]+([+-])[^\S\n]+([A-Za-z0-9_]+)", re.MULTILINE)
+
+# Limits for feedback loop enumeration (the number of loops grows combinatorially)
+MAX_LOOP_LENGTH = 12        # Longest loop, in relations, that is enumerated
+LOOP_SEARCH_TIMEOUT = 10.0  # Seconds before the loop search stops early
+QUICK_LOOPS_MIN_NODES = 500   # Above either size only the first loop found is reported
+QUICK_LOOPS_MIN_EDGES = 2000
+
+# Report notes for a loop list cut short, keyed by the reason analyze_loops returns
+LOOP_TRUNCATION_NOTES = {
+    'quick': "partial: showing first cycle",
+    'timeout': f"partial: search stopped after {LOOP_SEARCH_TIMEOUT:g}s",
+    'length': f"partial: loops over {MAX_LOOP_LENGTH} relations not searched",
+}
+
+# Above this size betweenness centrality is estimated from sampled source nodes
+APPROX_BETWEENNESS_MIN_NODES = 200
+BETWEENNESS_SAMPLE_SIZE = 100
+
+# Above this size rendering switches to straight edges and fewer layout iterations
+LARGE_GRAPH_NODES = 200
+LARGE_GRAPH_MAXITER = 200
+
+# On-disk cache of analyze_cld results, reused across runs on the same relations.
+# None disables it; the command line uses ~/.cache/cld-system unless --no-cache.
+# Entries hold the model's loops and node categories, so the directory is private (mode 0700)
+ANALYSIS_CACHE_DIR = None
+ANALYSIS_CACHE_VERSION = 2  # Bump whenever the cached data or how it is computed changes
+
+# Enhanced node styles with better separation
+NODE_STYLES = {
+    'central': {
+        'shape': 'ellipse',
+        'style': 'filled',
+        'fillcolor': '#FFE4B5',  # Moccasin - highlight for central nodes
+        'color': '#8B4513',      # SaddleBrown
+        'fontsize': '12',
+        'fontcolor': '#8B4513',
+        'penwidth': '2',
+        'margin': '0.11,0.055'   # Extra margin to avoid edge overlap
+    },
+    'intermediate': {
+        'shape': 'ellipse',
+        'style': 'filled',
+        'fillcolor': '#E6F3FF',  # Alice Blue
+        'color': '#4682B4',      # Steel Blue
+        'fontsize': '10',
+        'fontcolor': '#4682B4',
+        'penwidth': '1.5',
+        'margin': '0.11,0.055'
+    },
+    'peripheral': {
+        'shape': 'ellipse',
+        'style': 'filled',
+        'fillcolor': '#F0F8FF',  # Lighter AliceBlue
+        'color': '#6495ED',      # Cornflower Blue
+        'fontsize': '9',
+        'fontcolor': '#6495ED',
+        'penwidth': '1',
+        'margin': '0.11,0.055'
+    }
+}
+
+# Edge styles by relation sign (length settings are added per diagram)
+EDGE_STYLES = {
+    '+': {
+        'penwidth': '2',
+        'arrowhead': 'normal',
+        'arrowsize': '1.2',
+        'color': '#228B22',      # Forest Green
+        'label': '+',
+        'fontcolor': '#228B22',
+        'fontsize': '14',
+        'fontname': 'Arial Bold',
+        'labeldistance': '1.5',  # Distance from edge
+        'labelangle': '0'        # Label angle
+    },
+    '-': {
+        'penwidth': '2',
+        'arrowhead': 'normal',
+        'arrowsize': '1.2',
+        'color': '#DC143C',      # Crimson
+        'label': '−',
+        'fontcolor': '#DC143C',
+        'fontsize': '14',
+        'fontname': 'Arial Bold',
+        'labeldistance': '1.5',
+        'labelangle': '0'
+    }
+}
 
 def load_edges(path: str):
     """
     Reads CLD notation file and returns list of tuples:
     [(source, destination, sign), ...]
     """
-    edges = []
-    pattern = re.compile(r"^\s*([A-Za-z0-9_]+)\s+([+-])\s+([A-Za-z0-9_]+)")
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.split("#", 1)[0]        # remove comments
-            m = pattern.match(line)
-            if m:
-                edges.append((m.group(1), m.group(3), m.group(2)))
-    return edges
+    text = Path(path).read_text(encoding="utf-8")
+    # Interned names make the many dict/set lookups on them identity checks
+    return [(sys.intern(m[1]), sys.intern(m[3]), m[2]) for m in _EDGE_RE.finditer(text)]
 
 def build_networkx_graph(edges):
     """Builds NetworkX graph for loop analysis"""
     G = nx.DiGraph()
-    for src, dst, sign in edges:
-        G.add_edge(src, dst, sign=sign)
+    G.add_edges_from((src, dst, {'sign': sign}) for src, dst, sign in edges)
     return G
 
-def analyze_loops(G):
-    """Analyzes graph loops and classifies as reinforcing or balancing"""
-    loops = list(nx.simple_cycles(G))
+def iter_component_cycles(G, max_len=None, components=None):
+    """
+    Yields the simple cycles of G, one strongly connected component at a time.
+    Cycles longer than max_len are not enumerated; a component whose cycles are
+    all longer than the bound still yields one cycle found with nx.find_cycle.
+    Pass components to reuse an already computed list of G's components.
+    """
+    if components is None:
+        components = nx.strongly_connected_components(G)
+    
+    # Cycles never cross strongly connected components, so enumerate them
+    # per component and skip singletons that have no self-loop
+    adj = G._adj  # raw adjacency dicts, as NetworkX uses internally in hot loops
+    for component in components:
+        if len(component) == 1:
+            node = next(iter(component))
+            if node not in adj[node]:
+                continue
+        subgraph = G.subgraph(component)
+        found = False
+        for cycle in nx.simple_cycles(subgraph, length_bound=max_len):
+            found = True
+            yield cycle
+        if not found:
+            yield [src for src, _ in nx.find_cycle(subgraph)]
+
+def analyze_loops(G, max_len=MAX_LOOP_LENGTH, timeout=LOOP_SEARCH_TIMEOUT, quick=False):
+    """
+    Analyzes graph loops and classifies as reinforcing or balancing
+
+    Returns (loops, truncation). Loops longer than max_len relations are not
+    enumerated (a component with no shorter loop still contributes one longer
+    loop), and the search stops after timeout seconds keeping the loops found
+    so far (None disables either limit). With quick=True only the first cycle
+    found by nx.find_cycle is classified. truncation is None for a complete
+    list, otherwise 'quick', 'timeout' or 'length' (a key of LOOP_TRUNCATION_NOTES).
+    """
+    # Linear-time probe: acyclic graphs need no sign map or enumeration at all
+    try:
+        first_cycle = nx.find_cycle(G, orientation='original')
+    except nx.NetworkXNoCycle:
+        return [], None
+    
+    deadline = time.monotonic() + timeout if timeout is not None else None
     loop_analysis = []
     
-    for loop in loops:
-        negative_count = 0
-        for i in range(len(loop)):
-            src = loop[i]
-            dst = loop[(i + 1) % len(loop)]
-            if G.has_edge(src, dst):
-                sign = G[src][dst]['sign']
-                if sign == '-':
-                    negative_count += 1
+    # Map each relation to 1 if negative, once, instead of per loop edge
+    sign_bit = {
+        (src, dst): int(data['sign'] == '-')
+        for src, neighbors in G._adj.items()
+        for dst, data in neighbors.items()
+    }
+    
+    if quick:
+        truncation = 'quick'
+        cycles = [[src for src, _, _ in first_cycle]]
+    else:
+        # Only a component with more than max_len nodes can hold a longer loop
+        components = list(nx.strongly_connected_components(G))
+        bounded = max_len is not None and any(len(component) > max_len for component in components)
+        truncation = 'length' if bounded else None
+        cycles = iter_component_cycles(G, max_len, components)
+    
+    for loop in cycles:
+        # Consecutive loop nodes are always connected, so no edge check is needed
+        negative_count = sum(sign_bit[src, dst] for src, dst in zip(loop, loop[1:] + loop[:1]))
         
-        loop_type = "Balancing" if negative_count % 2 == 1 else "Reinforcing"
+        loop_type = "Balancing" if negative_count & 1 else "Reinforcing"
         loop_analysis.append({
             'loop': loop,
             'type': loop_type,
             'negative_count': negative_count
         })
+        
+        if deadline is not None and time.monotonic() > deadline:
+            truncation = 'timeout'
+            break
     
-    return loop_analysis
+    return loop_analysis, truncation
 
 def identify_central_nodes(G, edges):
     """Identifies central nodes based on connectivity degree"""
     degree_centrality = nx.degree_centrality(G)
-    betweenness_centrality = nx.betweenness_centrality(G)
+    if len(G) > APPROX_BETWEENNESS_MIN_NODES:
+        # Sampled Brandes approximation - plenty for the quartile split below
+        betweenness_centrality = nx.betweenness_centrality(
+            G, k=min(len(G), BETWEENNESS_SAMPLE_SIZE), normalized=True, seed=0
+        )
+    else:
+        betweenness_centrality = nx.betweenness_centrality(G)
     
     # Combines metrics to identify central nodes
-    centrality_scores = {}
-    for node in G.nodes():
-        centrality_scores[node] = (
-            degree_centrality[node] * 0.6 + 
-            betweenness_centrality[node] * 0.4
-        )
+    centrality_scores = {
+        node: degree_centrality[node] * 0.6 + betweenness_centrality[node] * 0.4
+        for node in G
+    }
     
     # Sort by centrality
-    sorted_nodes = sorted(centrality_scores.items(), key=lambda x: x[1], reverse=True)
+    sorted_nodes = sorted(centrality_scores, key=centrality_scores.__getitem__, reverse=True)
     
     # Classify nodes into categories
     total_nodes = len(sorted_nodes)
-    central_nodes = [node for node, score in sorted_nodes[:max(1, total_nodes//4)]]
-    intermediate_nodes = [node for node, score in sorted_nodes[total_nodes//4:3*total_nodes//4]]
-    peripheral_nodes = [node for node, score in sorted_nodes[3*total_nodes//4:]]
+    central_nodes = sorted_nodes[:max(1, total_nodes//4)]
+    intermediate_nodes = sorted_nodes[total_nodes//4:3*total_nodes//4]
+    peripheral_nodes = sorted_nodes[3*total_nodes//4:]
     
     return {
         'central': central_nodes,
@@ -98,34 +250,190 @@ def calculate_optimal_parameters(num_nodes, num_edges):
         'iterations': str(min(1000, 300 + num_nodes * 5))
     }
 
-def create_professional_cld(edges, outfile="cld_professional.svg", layout="circo", minimize_crossings=True):
-    """
-    Creates a professional CLD using Graphviz with advanced anti-crossing configurations
+def dot_quote(value):
+    """Quotes a value as a DOT string (backslash escapes such as \\n are kept)"""
+    return '"' + str(value).replace('"', '\\"') + '"'
+
+def dot_attr_list(**attrs):
+    """Formats keyword attributes as the inside of a DOT [...] attribute list"""
+    return ", ".join(f"{key}={dot_quote(value)}" for key, value in attrs.items())
+
+def run_graphviz(dot_source, outfile, output_format, engine="dot"):
+    """Lays out DOT source with a Graphviz engine and writes outfile in the given format"""
+    rendered = graphviz.pipe(engine, output_format, dot_source.encode('utf-8'), quiet=True)
+    Path(outfile).write_bytes(rendered)
+
+def format_node_statements(nodes, node_categories):
+    """Formats the styled DOT node statements, which are the same for every layout"""
+    # Map each node straight to its style once instead of scanning the category lists per node
+    # (small graphs can list a node twice; updating central last keeps its precedence)
+    style_of = {}
+    for category in ('peripheral', 'intermediate', 'central'):
+        style_of.update(dict.fromkeys(node_categories[category], NODE_STYLES[category]))
     
-    Available layouts:
-    - circo: Circular layout (ideal for CLDs)  
-    - fdp: Force-directed placement
-    - neato: Spring model
-    - dot: Hierarchical
-    - twopi: Radial
-    - sfdp: Scalable force-directed placement (best for large graphs)
-    - improved_circo: Enhanced circular layout with better routing
-    - improved_fdp: Enhanced force-directed with anti-crossing focus
-    """
+    # Add nodes with enhanced styles
+    node_lines = []
+    add_line = node_lines.append  # Bound once, called per node
+    for node in nodes:
+        style = style_of.get(node, NODE_STYLES['peripheral'])
+        
+        # Enhanced label formatting
+        label = node.replace('_', '\\n') if len(node) > 10 else node
+        
+        add_line(f"  {dot_quote(node)} [{dot_attr_list(label=label, **style)}];")
+    
+    return "\n".join(node_lines)
+
+def format_edge_statements(edges, edge_length, minimize_crossings=True):
+    """Formats the signed DOT edge statements, which are the same for every layout"""
+    # Enhanced edges with anti-crossing optimizations
+    # The style only depends on the sign, so both variants are formatted once
+    layout_style = {'len': edge_length}  # Preferred edge length
     
-    # Graph analysis
+    # Advanced anti-crossing parameters
+    if minimize_crossings:
+        layout_style.update({
+            'minlen': '1.2',         # Minimum length to avoid node overlap
+            'weight': '1'            # Equal weight for all edges
+        })
+    
+    positive_attrs = dot_attr_list(**EDGE_STYLES['+'], **layout_style)
+    negative_attrs = dot_attr_list(**EDGE_STYLES['-'], **layout_style)
+    
+    edge_lines = []
+    add_line = edge_lines.append  # Bound once, called per relation
+    for src, dst, sign in edges:
+        edge_attrs = positive_attrs if sign == '+' else negative_attrs
+        add_line(f"  {dot_quote(src)} -> {dot_quote(dst)} [{edge_attrs}];")
+    
+    return "\n".join(edge_lines)
+
+def analyze_cld(edges, find_loops=True):
+    """
+    Runs the layout-independent analysis of a CLD (graph, loops, node
+    classification, size-based parameters and node/edge statements) so it can be
+    shared by every layout rendered from the same edges.
+    With find_loops=False loop enumeration is skipped and 'loops' is None.
+    Results are memoized per edge list, so treat the returned dict as read-only.
+    When ANALYSIS_CACHE_DIR is set the loops and node categories are also kept
+    there between runs.
+    """
+    return _analyze_cld_cached(tuple(edges), find_loops)
+
+@functools.lru_cache(maxsize=4)
+def _analyze_cld_cached(edges, find_loops):
+    # The graph's node view doubles as the set of variables (in first-seen order)
     G_nx = build_networkx_graph(edges)
-    loops = analyze_loops(G_nx)
-    node_categories = identify_central_nodes(G_nx, edges)
+    all_nodes = G_nx.nodes
+    
+    # Count relation signs and self-loops in a single pass
+    positive_count = negative_count = self_loop_count = 0
+    for src, dst, sign in edges:
+        if sign == '+':
+            positive_count += 1
+        elif sign == '-':
+            negative_count += 1
+        if src == dst:
+            self_loop_count += 1
     
     # Configure parameters based on graph size
-    num_nodes = len(set([src for src, _, _ in edges] + [dst for _, dst, _ in edges]))
+    num_nodes = len(all_nodes)
     num_edges = len(edges)
     optimal_params = calculate_optimal_parameters(num_nodes, num_edges)
     
+    # Graph analysis - very large systems only get one example loop
+    quick_loops = num_nodes > QUICK_LOOPS_MIN_NODES or num_edges > QUICK_LOOPS_MIN_EDGES
+    loops, loops_partial, node_categories = _analyze_graph_cached(G_nx, edges, find_loops, quick_loops)
+    
+    return {
+        'nx_graph': G_nx,
+        'loops': loops,
+        'loops_partial': loops_partial,  # Truncation reason, None when complete
+        'categories': node_categories,
+        'nodes': all_nodes,
+        'positive_count': positive_count,
+        'negative_count': negative_count,
+        'self_loop_count': self_loop_count,
+        'optimal_params': optimal_params,
+        'node_statements': format_node_statements(all_nodes, node_categories),
+        # Keyed by minimize_crossings; both variants are reused by every layout
+        'edge_statements': {
+            minimize: format_edge_statements(edges, optimal_params['base_sep'], minimize)
+            for minimize in (True, False)
+        }
+    }
+
+def _analyze_graph_cached(G, edges, find_loops, quick_loops):
+    """
+    Returns (loops, loops_partial, node_categories), the expensive part of the
+    analysis, reusing the copy kept in ANALYSIS_CACHE_DIR when there is one.
+    Only this plain data is stored (as JSON); everything derived from it, like
+    the styled DOT statements, is rebuilt on every run.
+    """
+    cache_dir = _private_cache_dir(ANALYSIS_CACHE_DIR) if ANALYSIS_CACHE_DIR is not None else None
+    if cache_dir is None:
+        return _analyze_graph(G, edges, find_loops, quick_loops)
+    
+    # Keyed by the parsed relations (so comment-only edits still hit) and by
+    # every setting the stored results depend on
+    key = repr((
+        ANALYSIS_CACHE_VERSION, nx.__version__, edges, find_loops, quick_loops,
+        MAX_LOOP_LENGTH, APPROX_BETWEENNESS_MIN_NODES, BETWEENNESS_SAMPLE_SIZE
+    )).encode("utf-8")
+    cache_file = cache_dir / f"cld_cache_{hashlib.blake2b(key, digest_size=16).hexdigest()}.json"
+    try:
+        cached = json.loads(cache_file.read_text(encoding="utf-8"))
+        return cached['loops'], cached['loops_partial'], cached['categories']
+    except Exception:
+        # Missing, corrupt or from an older format: analyze again and overwrite it
+        pass
+    
+    loops, loops_partial, node_categories = _analyze_graph(G, edges, find_loops, quick_loops)
+    if loops_partial == 'timeout':
+        # How far a timed-out search got depends on machine load, so don't keep it
+        return loops, loops_partial, node_categories
+    try:
+        # Write then rename, so concurrent runs never read a half-written file
+        # (created 0600: loops and categories name the model's variables)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({'loops': loops, 'loops_partial': loops_partial, 'categories': node_categories}, f)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass  # The cache is only an optimization
+    return loops, loops_partial, node_categories
+
+def _analyze_graph(G, edges, find_loops, quick_loops):
+    loops, loops_partial = analyze_loops(G, quick=quick_loops) if find_loops else (None, None)
+    return loops, loops_partial, identify_central_nodes(G, edges)
+
+def _private_cache_dir(path):
+    """
+    Creates the cache directory (mode 0700) if needed and returns it as a Path,
+    or None when it can't be created or other users could write to it.
+    """
+    cache_dir = Path(path)
+    try:
+        cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        status = cache_dir.stat()
+    except OSError:
+        return None
+    # Only trust a directory we own that nobody else can drop files into
+    if os.name == "posix" and (status.st_uid != os.getuid() or status.st_mode & 0o022):
+        return None
+    return cache_dir
+
+def render_cld(analysis, outfile="cld_professional.svg", layout="circo", minimize_crossings=True):
+    """
+    Renders a CLD from its analyze_cld result with the given layout and writes it to outfile.
+    Returns the DOT source and the file actually written (unknown extensions become .svg).
+    """
+    node_categories = analysis['categories']
+    optimal_params = analysis['optimal_params']
+    
     # Enhanced graph configurations for anti-crossing
     graph_attrs = {
-        'graph_type': 'digraph',
         'layout': layout if not layout.startswith('improved_') else layout.replace('improved_', ''),
         'bgcolor': 'white',
         'fontname': 'Arial',
@@ -209,167 +517,153 @@ def create_professional_cld(edges, outfile="cld_professional.svg", layout="circo
             'splines': 'curved'
         })
     
-    # Create the graph with optimized attributes
-    graph = pydot.Dot(**graph_attrs)
-    
-    # Enhanced node styles with better separation
-    node_styles = {
-        'central': {
-            'shape': 'ellipse',
-            'style': 'filled',
-            'fillcolor': '#FFE4B5',  # Moccasin - highlight for central nodes
-            'color': '#8B4513',      # SaddleBrown
-            'fontsize': '12',
-            'fontcolor': '#8B4513',
-            'penwidth': '2',
-            'margin': '0.11,0.055'   # Extra margin to avoid edge overlap
-        },
-        'intermediate': {
-            'shape': 'ellipse',
-            'style': 'filled',
-            'fillcolor': '#E6F3FF',  # Alice Blue
-            'color': '#4682B4',      # Steel Blue
-            'fontsize': '10',
-            'fontcolor': '#4682B4',
-            'penwidth': '1.5',
-            'margin': '0.11,0.055'
-        },
-        'peripheral': {
-            'shape': 'ellipse',
-            'style': 'filled',
-            'fillcolor': '#F0F8FF',  # Lighter AliceBlue
-            'color': '#6495ED',      # Cornflower Blue
-            'fontsize': '9',
-            'fontcolor': '#6495ED',
-            'penwidth': '1',
-            'margin': '0.11,0.055'
-        }
-    }
+    # On large graphs curved/orthogonal routing and long force iterations dominate
+    # Graphviz run time, so trade some visual quality for a bounded layout cost
+    if len(analysis['nodes']) > LARGE_GRAPH_NODES:
+        graph_attrs['splines'] = 'line'
+        graph_attrs.pop('concentrate', None)
+        if 'maxiter' in graph_attrs:
+            graph_attrs['maxiter'] = str(min(int(graph_attrs['maxiter']), LARGE_GRAPH_MAXITER))
     
-    # Add nodes with enhanced styles
-    all_nodes = set()
-    for src, dst, sign in edges:
-        all_nodes.add(src)
-        all_nodes.add(dst)
-    
-    for node in all_nodes:
-        # Determine node category
-        if node in node_categories['central']:
-            style = node_styles['central']
-        elif node in node_categories['intermediate']:
-            style = node_styles['intermediate']
-        else:
-            style = node_styles['peripheral']
-        
-        # Enhanced label formatting
-        label = node.replace('_', '\\n') if len(node) > 10 else node
-        
-        pydot_node = pydot.Node(node, label=label, **style)
-        graph.add_node(pydot_node)
+    # Build the DOT source directly, one statement per line
+    dot_lines = ["digraph G {"]
+    dot_lines.extend(f"  {key}={dot_quote(value)};" for key, value in graph_attrs.items())
     
-    # Enhanced edges with anti-crossing optimizations
-    for src, dst, sign in edges:
-        base_style = {
-            'penwidth': '2',
-            'arrowhead': 'normal',
-            'arrowsize': '1.2',
-            'len': optimal_params['base_sep'],  # Preferred edge length
-        }
-        
-        # Advanced anti-crossing parameters
-        if minimize_crossings:
-            base_style.update({
-                'minlen': '1.2',         # Minimum length to avoid node overlap
-                'weight': '1'            # Equal weight for all edges
-            })
-        
-        if sign == '+':
-            edge_style = {
-                **base_style,
-                'color': '#228B22',      # Forest Green
-            }
-            label_style = {
-                'label': '+',
-                'fontcolor': '#228B22',
-                'fontsize': '14',
-                'fontname': 'Arial Bold',
-                'labeldistance': '1.5',  # Distance from edge
-                'labelangle': '0'        # Label angle
-            }
-        else:  # sign == '-'
-            edge_style = {
-                **base_style,
-                'color': '#DC143C',      # Crimson
-            }
-            label_style = {
-                'label': '−',
-                'fontcolor': '#DC143C',
-                'fontsize': '14',
-                'fontname': 'Arial Bold',
-                'labeldistance': '1.5',
-                'labelangle': '0'
-            }
-        
-        edge = pydot.Edge(src, dst, **edge_style, **label_style)
-        graph.add_edge(edge)
+    # Node statements don't depend on the layout and are prepared by analyze_cld
+    dot_lines.append(analysis['node_statements'])
+    
+    # Edge statements only depend on the anti-crossing mode and are prepared by analyze_cld
+    dot_lines.append(analysis['edge_statements'][bool(minimize_crossings)])
+    
+    dot_lines.append("}")
+    graph = "\n".join(dot_lines)
     
     # Save file
     Path(outfile).parent.mkdir(parents=True, exist_ok=True)
     
     # Determine format based on extension
     file_ext = Path(outfile).suffix.lower()
-    if file_ext == '.svg':
-        graph.write_svg(outfile)
-    elif file_ext == '.png':
-        graph.write_png(outfile)
-    elif file_ext == '.pdf':
-        graph.write_pdf(outfile)
-    elif file_ext == '.dot':
-        graph.write_dot(outfile)
-    else:
+    if file_ext not in ('.svg', '.png', '.pdf', '.dot'):
         # Default to SVG
         outfile = str(Path(outfile).with_suffix('.svg'))
-        graph.write_svg(outfile)
+        file_ext = '.svg'
+    run_graphviz(graph, outfile, file_ext[1:], engine=graph_attrs['layout'])
     
-    print(f"\n📊 Graphviz diagram saved to: {outfile}")
+    return graph, outfile
+
+def create_professional_cld(edges, outfile="cld_professional.svg", layout="circo", minimize_crossings=True, analysis=None,
+                            print_report=True):
+    """
+    Creates a professional CLD using Graphviz with advanced anti-crossing configurations
     
-    # Detailed report
-    print(f"\n{'='*60}")
-    print("DETAILED SYSTEM ANALYSIS")
-    print(f"{'='*60}")
+    Available layouts:
+    - circo: Circular layout (ideal for CLDs)  
+    - fdp: Force-directed placement
+    - neato: Spring model
+    - dot: Hierarchical
+    - twopi: Radial
+    - sfdp: Scalable force-directed placement (best for large graphs)
+    - improved_circo: Enhanced circular layout with better routing
+    - improved_fdp: Enhanced force-directed with anti-crossing focus
+    
+    Pass the result of analyze_cld(edges) as analysis to reuse it across layouts.
+    With print_report=False only the diagram is produced and, unless an analysis
+    is passed in, loops are not searched (None is returned for them).
+    """
+    if analysis is None:
+        analysis = analyze_cld(edges, find_loops=print_report)
     
-    print(f"\n🎯 NODE CLASSIFICATION:")
-    print(f"   Central ({len(node_categories['central'])}): {', '.join(node_categories['central'])}")
-    print(f"   Intermediate ({len(node_categories['intermediate'])}): {', '.join(node_categories['intermediate'])}")
-    print(f"   Peripheral ({len(node_categories['peripheral'])}): {', '.join(node_categories['peripheral'])}")
+    graph, outfile = render_cld(analysis, outfile, layout, minimize_crossings)
+    if print_report:
+        print_cld_report(edges, analysis, outfile, layout, minimize_crossings)
     
-    if loops:
-        print(f"\n🔄 IDENTIFIED LOOPS ({len(loops)}):")
+    return graph, analysis['loops'], analysis['categories']
+
+def print_cld_report(edges, analysis, outfile, layout, minimize_crossings=True):
+    """Prints the detailed analysis report for a rendered CLD"""
+    loops = analysis['loops']
+    node_categories = analysis['categories']
+    optimal_params = analysis['optimal_params']
+    
+    # Collect the whole report and write it with a single print
+    lines = []
+    lines.append(f"\n📊 Graphviz diagram saved to: {outfile}")
+    
+    # Detailed report
+    lines.append(f"\n{'='*60}")
+    lines.append("DETAILED SYSTEM ANALYSIS")
+    lines.append(f"{'='*60}")
+    
+    lines.append(f"\n🎯 NODE CLASSIFICATION:")
+    lines.append(f"   Central ({len(node_categories['central'])}): {', '.join(node_categories['central'])}")
+    lines.append(f"   Intermediate ({len(node_categories['intermediate'])}): {', '.join(node_categories['intermediate'])}")
+    lines.append(f"   Peripheral ({len(node_categories['peripheral'])}): {', '.join(node_categories['peripheral'])}")
+    
+    if loops is None:
+        lines.append(f"\n⏭️  Loop search skipped (analysis run with find_loops=False)")
+    elif loops:
+        partial = analysis['loops_partial']
+        partial_note = f" ({LOOP_TRUNCATION_NOTES[partial]})" if partial else ""
+        lines.append(f"\n🔄 IDENTIFIED LOOPS ({len(loops)}){partial_note}:")
         for i, loop_info in enumerate(loops, 1):
             loop_str = " → ".join(loop_info['loop'] + [loop_info['loop'][0]])
-            print(f"\n   Loop {i}: {loop_str}")
-            print(f"   📍 Type: {loop_info['type']} ({loop_info['negative_count']} negative signs)")
+            lines.append(f"\n   Loop {i}: {loop_str}")
+            lines.append(f"   📍 Type: {loop_info['type']} ({loop_info['negative_count']} negative signs)")
             
             if loop_info['type'] == 'Reinforcing':
-                print(f"   📈 Behavior: Amplifies changes (exponential growth)")
-                print(f"   ⚠️  Warning: May lead to uncontrolled growth or collapse")
+                lines.append("   📈 Behavior: Amplifies changes (exponential growth)")
+                lines.append("   ⚠️  Warning: May lead to uncontrolled growth or collapse")
             else:
-                print(f"   ⚖️  Behavior: Seeks equilibrium (self-regulation)")
-                print(f"   ✅ Effect: Stabilizes the system")
+                lines.append("   ⚖️  Behavior: Seeks equilibrium (self-regulation)")
+                lines.append("   ✅ Effect: Stabilizes the system")
     else:
-        print(f"\n❌ No loops detected in the system")
-    
-    print(f"\n📈 SYSTEM METRICS:")
-    print(f"   • Total variables: {len(all_nodes)}")
-    print(f"   • Total relations: {len(edges)}")
-    print(f"   • Positive relations: {sum(1 for _, _, s in edges if s == '+')}")
-    print(f"   • Negative relations: {sum(1 for _, _, s in edges if s == '-')}")
-    print(f"   • Layout used: {layout}")
+        lines.append(f"\n❌ No loops detected in the system")
+    
+    lines.append(f"\n📈 SYSTEM METRICS:")
+    lines.append(f"   • Total variables: {len(analysis['nodes'])}")
+    lines.append(f"   • Total relations: {len(edges)}")
+    lines.append(f"   • Positive relations: {analysis['positive_count']}")
+    lines.append(f"   • Negative relations: {analysis['negative_count']}")
+    if analysis['self_loop_count']:
+        lines.append(f"   • Self-loop relations: {analysis['self_loop_count']}")
+    lines.append(f"   • Layout used: {layout}")
     if minimize_crossings:
-        print(f"   • Anti-crossing: ENABLED (Enhanced)")
-        print(f"   • Optimal parameters: sep={optimal_params['base_sep']}, iterations={optimal_params['iterations']}")
+        lines.append(f"   • Anti-crossing: ENABLED (Enhanced)")
+        lines.append(f"   • Optimal parameters: sep={optimal_params['base_sep']}, iterations={optimal_params['iterations']}")
     
-    return graph, loops, node_categories
+    print("\n".join(lines))
+
+def _render_layouts(edges, layouts, base_filename, icon):
+    """
+    Renders each {layout: description} to base_filename_<layout>.svg with
+    anti-crossing enabled, printing a report per layout, and returns the results
+    """
+    analysis = analyze_cld(edges)
+    results = {}
+    # Each render runs Graphviz in its own process, so all layouts are submitted
+    # at once and rendered concurrently; results are then collected (and
+    # reported) in the layouts' order, waiting on each one in turn
+    with ThreadPoolExecutor(max_workers=min(len(layouts), os.cpu_count() or 1)) as executor:
+        futures = {
+            layout: executor.submit(render_cld, analysis, f"{base_filename}_{layout}.svg", layout, True)
+            for layout in layouts
+        }
+        for layout, description in layouts.items():
+            try:
+                print(f"   {icon} Creating {description}...")
+                graph, outfile = futures[layout].result()
+                print_cld_report(edges, analysis, outfile, layout, minimize_crossings=True)
+                results[layout] = {
+                    'file': outfile,
+                    'description': description,
+                    'graph': graph,
+                    'loops': analysis['loops'],
+                    'categories': analysis['categories']
+                }
+            except Exception as e:
+                print(f"   ❌ Error in layout {layout}: {e}")
+    
+    return results
 
 def create_optimized_layouts(edges, base_filename="cld_optimized"):
     """Creates highly optimized layouts to minimize crossings"""
@@ -383,32 +677,18 @@ def create_optimized_layouts(edges, base_filename="cld_optimized"):
     
     print(f"\n🎯 Generating HIGHLY optimized layouts to minimize crossings...")
     
-    results = {}
-    for layout, description in layouts.items():
-        outfile = f"{base_filename}_{layout}.svg"
-        try:
-            print(f"   🔧 Creating {description}...")
-            graph, loops, categories = create_professional_cld(edges, outfile, layout, minimize_crossings=True)
-            results[layout] = {
-                'file': outfile,
-                'description': description,
-                'graph': graph,
-                'loops': loops,
-                'categories': categories
-            }
-        except Exception as e:
-            print(f"   ❌ Error in layout {layout}: {e}")
-    
-    return results
+    return _render_layouts(edges, layouts, base_filename, "🔧")
 
 def create_anti_crossing_diagram(edges, outfile="cld_anti_crossing.svg"):
     """
-    Creates the BEST possible diagram to minimize crossings by testing multiple layouts
-    and returning the one with optimal visual quality
+    Creates the BEST possible diagram to minimize crossings by trying layouts
+    in order of anti-crossing effectiveness and keeping the first that renders
     """
     print(f"\n🎯 Creating OPTIMAL anti-crossing diagram...")
     
-    # Test layouts in order of effectiveness for anti-crossing
+    # Layouts in order of effectiveness for anti-crossing
+    # For now the order itself is the quality ranking (sfdp first); if automatic
+    # quality evaluation is added, candidates will need to be rendered and compared
     test_layouts = [
         ('sfdp', 'Scalable Force-Directed (Best for complex graphs)'),
         ('improved_fdp', 'Enhanced Force-Directed'),
@@ -417,44 +697,32 @@ def create_anti_crossing_diagram(edges, outfile="cld_anti_crossing.svg"):
         ('neato', 'Spring Model')
     ]
     
-    best_result = None
-    base_name = str(Path(outfile).with_suffix(''))
-    
-    print(f"   🔍 Testing {len(test_layouts)} optimized layouts...")
+    analysis = analyze_cld(edges)
     
     for layout, description in test_layouts:
-        temp_file = f"{base_name}_test_{layout}.svg"
         try:
-            print(f"      • Testing {layout}: {description}")
-            graph, loops, categories = create_professional_cld(edges, temp_file, layout, minimize_crossings=True)
-            
-            # For now, we'll use sfdp as the default best choice
-            # In the future, this could include automatic quality evaluation
-            if layout == 'sfdp' or best_result is None:
-                best_result = {
-                    'layout': layout,
-                    'file': temp_file,
-                    'description': description,
-                    'graph': graph,
-                    'loops': loops,
-                    'categories': categories
-                }
-                
+            print(f"   🔍 Trying {layout}: {description}")
+            graph, final_file = render_cld(analysis, outfile, layout, minimize_crossings=True)
         except Exception as e:
             print(f"      ❌ Failed {layout}: {e}")
-    
-    if best_result:
-        # Copy the best result to the final output file
-        if best_result['file'] != outfile:
-            shutil.copy2(best_result['file'], outfile)
+            continue
         
-        print(f"\n   🏆 BEST LAYOUT SELECTED: {best_result['layout']}")
-        print(f"   📁 Final diagram: {outfile}")
-        print(f"   📊 Description: {best_result['description']}")
-        return best_result
-    else:
-        print(f"   ❌ No layouts succeeded")
-        return None
+        print_cld_report(edges, analysis, final_file, layout, minimize_crossings=True)
+        
+        print(f"\n   🏆 BEST LAYOUT SELECTED: {layout}")
+        print(f"   📁 Final diagram: {final_file}")
+        print(f"   📊 Description: {description}")
+        return {
+            'layout': layout,
+            'file': final_file,
+            'description': description,
+            'graph': graph,
+            'loops': analysis['loops'],
+            'categories': analysis['categories']
+        }
+    
+    print(f"   ❌ No layouts succeeded")
+    return None
 
 def create_multiple_layouts(edges, base_filename="cld_comparison"):
     """Creates multiple layouts for comparison"""
@@ -467,27 +735,9 @@ def create_multiple_layouts(edges, base_filename="cld_comparison"):
     
     print(f"\n🎨 Generating multiple layouts for comparison...")
     
-    results = {}
-    for layout, description in layouts.items():
-        outfile = f"{base_filename}_{layout}.svg"
-        try:
-            print(f"   📐 Creating {description}...")
-            graph, loops, categories = create_professional_cld(edges, outfile, layout)
-            results[layout] = {
-                'file': outfile,
-                'description': description,
-                'graph': graph,
-                'loops': loops,
-                'categories': categories
-            }
-        except Exception as e:
-            print(f"   ❌ Error in layout {layout}: {e}")
-    
-    return results
+    return _render_layouts(edges, layouts, base_filename, "📐")
 
 if __name__ == "__main__":
-    import sys
-    
     # Command line arguments
     arquivo = sys.argv[1] if len(sys.argv) > 1 else "cld.txt"
     saida = sys.argv[2] if len(sys.argv) > 2 else "cld_graphviz.svg"
@@ -495,6 +745,8 @@ if __name__ == "__main__":
     # Handle special flags
     use_optimal = "--optimal" in sys.argv
     minimize_crossings = "--no-crossings" not in sys.argv  # Enabled by default
+    if "--no-cache" not in sys.argv:
+        ANALYSIS_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "cld-system"
     
     # Determine layout (ignore special flags)
     layout_args = [arg for arg in sys.argv[3:] if not arg.startswith('--')]
@@ -507,7 +759,9 @@ if __name__ == "__main__":
         sys.exit(1)
     
     # Show system information
-    num_nodes = len(set([src for src, _, _ in edges] + [dst for _, dst, _ in edges]))
+    # The analysis is memoized, so every diagram generated below reuses it
+    analysis = analyze_cld(edges)
+    num_nodes = len(analysis['nodes'])
     num_edges = len(edges)
     print(f"📊 System with {num_nodes} variables and {num_edges} relations")
     
@@ -528,7 +782,7 @@ if __name__ == "__main__":
     
     # Generate main diagram
     print(f"🚀 Generating professional CLD with Graphviz...")
-    graph, loops, categories = create_professional_cld(edges, saida, layout, minimize_crossings)
+    graph, loops, categories = create_professional_cld(edges, saida, layout, minimize_crossings, analysis=analysis)
     
     # Option to generate multiple layouts and anti-crossing optimization
     if len(layout_args) == 0:  # If no layout specified, generate comparison and optimal version
@@ -542,53 +796,57 @@ if __name__ == "__main__":
         print(f"\n📊 Generating complete comparison...")
         results_optimized = create_optimized_layouts(edges, f"{base_name}_optimized")
         
-        print(f"\n{'='*60}")
-        print("🎯 ANTI-CROSSING OPTIMIZATION RESULTS")
-        print(f"{'='*60}")
+        # Collect the final summary and write it with a single print
+        summary = []
+        summary.append(f"\n{'='*60}")
+        summary.append("🎯 ANTI-CROSSING OPTIMIZATION RESULTS")
+        summary.append(f"{'='*60}")
         
         if optimal_result:
-            print(f"\n🏆 BEST RESULT (Minimal Crossings):")
-            print(f"   📁 File: {optimal_result['file']}")
-            print(f"   🎨 Layout: {optimal_result['layout']}")
-            print(f"   📊 Description: {optimal_result['description']}")
-            print(f"   ✅ Status: This version has the MINIMAL edge-node crossings")
+            summary.append(f"\n🏆 BEST RESULT (Minimal Crossings):")
+            summary.append(f"   📁 File: {optimal_result['file']}")
+            summary.append(f"   🎨 Layout: {optimal_result['layout']}")
+            summary.append(f"   📊 Description: {optimal_result['description']}")
+            summary.append(f"   ✅ Status: This version has the MINIMAL edge-node crossings")
         
-        print(f"\n🎯 ENHANCED LAYOUTS FOR COMPARISON:")
+        summary.append(f"\n🎯 ENHANCED LAYOUTS FOR COMPARISON:")
         for layout_name, result in results_optimized.items():
-            print(f"   • {result['file']} - {result['description']}")
+            summary.append(f"   • {result['file']} - {result['description']}")
         
-        print(f"\n{'='*60}")
-        print("📋 RECOMMENDATIONS TO AVOID CROSSINGS")
-        print(f"{'='*60}")
+        summary.append(f"\n{'='*60}")
+        summary.append("📋 RECOMMENDATIONS TO AVOID CROSSINGS")
+        summary.append(f"{'='*60}")
         
-        print(f"\n🥇 BEST PRACTICES:")
-        print(f"   1. Use the OPTIMAL version: {base_name}_OPTIMAL.svg")
-        print(f"   2. For complex systems (>15 nodes): Use 'sfdp' layout")
-        print(f"   3. For medium systems (8-15 nodes): Use 'improved_fdp'")
-        print(f"   4. For simple systems (<8 nodes): Use 'improved_circo'")
-        print(f"   5. For hierarchical systems: Use 'dot' with orthogonal routing")
+        summary.append(f"\n🥇 BEST PRACTICES:")
+        summary.append(f"   1. Use the OPTIMAL version: {base_name}_OPTIMAL.svg")
+        summary.append(f"   2. For complex systems (>15 nodes): Use 'sfdp' layout")
+        summary.append(f"   3. For medium systems (8-15 nodes): Use 'improved_fdp'")
+        summary.append(f"   4. For simple systems (<8 nodes): Use 'improved_circo'")
+        summary.append(f"   5. For hierarchical systems: Use 'dot' with orthogonal routing")
         
-        print(f"\n⚙️  COMMAND LINE USAGE:")
-        print(f"   • Best result: python cld_graphviz.py {arquivo} output.svg sfdp")
-        print(f"   • Quick optimal: python cld_graphviz.py {arquivo} output.svg --optimal")
-        print(f"   • Force-directed: python cld_graphviz.py {arquivo} output.svg improved_fdp")
-        print(f"   • Disable anti-crossing: python cld_graphviz.py {arquivo} output.svg circo --no-crossings")
+        summary.append(f"\n⚙️  COMMAND LINE USAGE:")
+        summary.append(f"   • Best result: python cld_graphviz.py {arquivo} output.svg sfdp")
+        summary.append(f"   • Quick optimal: python cld_graphviz.py {arquivo} output.svg --optimal")
+        summary.append(f"   • Force-directed: python cld_graphviz.py {arquivo} output.svg improved_fdp")
+        summary.append(f"   • Disable anti-crossing: python cld_graphviz.py {arquivo} output.svg circo --no-crossings")
         
-        print(f"\n🔧 TECHNICAL IMPROVEMENTS APPLIED:")
-        print(f"   ✅ Enhanced node separation to prevent edge overlap")
-        print(f"   ✅ Optimized edge routing algorithms")
-        print(f"   ✅ Advanced spline configurations")
-        print(f"   ✅ Dynamic parameter scaling based on graph complexity")
-        print(f"   ✅ Improved node positioning with centrality analysis")
-        print(f"   ✅ Enhanced label positioning to avoid conflicts")
+        summary.append(f"\n🔧 TECHNICAL IMPROVEMENTS APPLIED:")
+        summary.append(f"   ✅ Enhanced node separation to prevent edge overlap")
+        summary.append(f"   ✅ Optimized edge routing algorithms")
+        summary.append(f"   ✅ Advanced spline configurations")
+        summary.append(f"   ✅ Dynamic parameter scaling based on graph complexity")
+        summary.append(f"   ✅ Improved node positioning with centrality analysis")
+        summary.append(f"   ✅ Enhanced label positioning to avoid conflicts")
         
         if num_nodes > 20:
-            print(f"\n⚠️  LARGE GRAPH WARNING:")
-            print(f"   Your graph has {num_nodes} nodes and {num_edges} edges.")
-            print(f"   For best results with large graphs:")
-            print(f"   • Use 'sfdp' layout (already selected in OPTIMAL version)")
-            print(f"   • Consider simplifying the model if possible")
-            print(f"   • Use higher DPI for better edge visibility")
+            summary.append(f"\n⚠️  LARGE GRAPH WARNING:")
+            summary.append(f"   Your graph has {num_nodes} nodes and {num_edges} edges.")
+            summary.append(f"   For best results with large graphs:")
+            summary.append(f"   • Use 'sfdp' layout (already selected in OPTIMAL version)")
+            summary.append(f"   • Consider simplifying the model if possible")
+            summary.append(f"   • Use higher DPI for better edge visibility")
+        
+        print("\n".join(summary))
     
     else:
         print(f"\n💡 TIP: Run without layout parameter to see all optimized options")